@@ -1,8 +1,132 @@
 """Extensions to the TensorFlow back-end for Keras."""
+import threading
 from keras import backend as K
+from keras.backend import tensorflow_backend
 from keras.backend.tensorflow_backend import tf
-from keras.backend.tensorflow_backend import _preprocess_conv2d_input
 from keras.backend.tensorflow_backend import _preprocess_padding
+from tensorflow.core.protobuf.rewriter_config_pb2 import RewriterConfig
+
+
+# the Keras session set by configure_session and its options
+_SESSION = None, None
+
+
+def _keras_session():
+    """Return the Keras session without creating (or initializing) one."""
+    session = tensorflow_backend._SESSION
+    # Keras >= 2.2.5 keeps the session in a thread local
+    if isinstance(session, threading.local):
+        return getattr(session, 'session', None)
+
+    return session
+
+
+def session_config(
+    auto_mixed_precision: bool=False,
+    jit_compile: bool=False,
+    base: 'ConfigProto'=None,
+) -> 'ConfigProto':
+    """
+    Return a new session configuration with the given graph options.
+
+    Args:
+        auto_mixed_precision: whether to enable the automatic mixed precision
+                              graph rewrite
+        jit_compile: whether to enable XLA just-in-time compilation
+        base: an optional configuration to copy other options (e.g.,
+              gpu_options) from (defaults to soft device placement)
+
+    Returns:
+        a new session configuration with the graph options set as given
+
+    Raises:
+        RuntimeError: if auto_mixed_precision is True and TensorFlow doesn't
+                      support the rewrite (i.e., TensorFlow < 1.14)
+
+    Notes:
+        the mixed precision rewrite only takes effect on GPUs with Tensor
+        Cores. it runs convolutions in float16 while keeping the variables
+        and numerically sensitive operations (e.g., Softmax, Log, Sum) in
+        float32. XLA compiles clusters of supported operations and runs the
+        rest (e.g., max pooling with ArgMax) as usual
+
+    """
+    config = tf.ConfigProto(allow_soft_placement=True)
+    if base is not None:
+        config.CopyFrom(base)
+    # set the mixed precision rewrite
+    rewrite_options = config.graph_options.rewrite_options
+    # the rewrite was added to the rewriter options in TensorFlow 1.14
+    if hasattr(rewrite_options, 'auto_mixed_precision'):
+        rewrite_options.auto_mixed_precision = (
+            RewriterConfig.ON if auto_mixed_precision else
+            RewriterConfig.DEFAULT
+        )
+    elif auto_mixed_precision:
+        msg = 'mixed precision requires TensorFlow >= 1.14, found {}'
+        raise RuntimeError(msg.format(tf.__version__))
+    # set auto-clustering of operations for XLA
+    optimizer_options = config.graph_options.optimizer_options
+    optimizer_options.global_jit_level = (
+        tf.OptimizerOptions.ON_1 if jit_compile else
+        tf.OptimizerOptions.DEFAULT
+    )
+
+    return config
+
+
+def configure_session(
+    auto_mixed_precision: bool=False,
+    jit_compile: bool=False,
+) -> None:
+    """
+    Configure the graph options of the Keras session.
+
+    Args:
+        auto_mixed_precision: whether to enable the automatic mixed precision
+                              graph rewrite (see session_config)
+        jit_compile: whether to enable XLA just-in-time compilation
+
+    Returns:
+        None
+
+    Notes:
+        the Keras session is replaced with a session with a new configuration
+        (copying the other options of the current session) if its options
+        differ from the given ones (the default session has neither option).
+        variables created before the replacement lose their values, so call
+        this before creating any (e.g., the variables of optimizers)
+
+    """
+    global _SESSION
+    session, options = _SESSION
+    current = _keras_session()
+    # the default Keras session (or one set elsewhere) has neither option
+    if session is None or current is not session:
+        options = (False, False)
+    # keep the current session if it already has the options
+    if options == (auto_mixed_precision, jit_compile):
+        return
+    # replace the session with one configured with the options
+    options = (auto_mixed_precision, jit_compile)
+    base = getattr(current, '_config', None)
+    session = tf.Session(config=session_config(*options, base=base))
+    K.set_session(session)
+    _SESSION = session, options
+
+
+def all_finite(tensors: list) -> 'Tensor':
+    """
+    Return whether all values in a list of tensors are finite.
+
+    Args:
+        tensors: the list of tensors to check for Inf and NaN values
+
+    Returns:
+        a boolean scalar tensor that is True if all values are finite
+
+    """
+    return tf.reduce_all([tf.reduce_all(tf.is_finite(t)) for t in tensors])
 
 
 def confusion_matrix(y_true, y_pred, num_classes=None):
@@ -45,20 +169,17 @@ def pool2d_argmax(x: 'Tensor', pool_size: tuple,
     """
     # get the normalized data format
     data_format = K.common.normalize_data_format(data_format)
-    # pre-process the input tensor
-    x, tf_data_format = _preprocess_conv2d_input(x, data_format)
     padding = _preprocess_padding(padding)
-    # update strides and pool size based on data format
-    if tf_data_format == 'NHWC':
-        strides = (1,) + strides + (1,)
-        pool_size = (1,) + pool_size + (1,)
-    else:
-        strides = (1, 1) + strides
-        pool_size = (1, 1) + pool_size
+    # max pooling with ArgMax only supports NHWC, NCHW -> NHWC
+    if data_format == 'channels_first':
+        x = tf.transpose(x, (0, 2, 3, 1))
+    # update strides and pool size for the NHWC format
+    strides = (1,) + strides + (1,)
+    pool_size = (1,) + pool_size + (1,)
     # get the values and the indexes from the max pool operation
     x, idx = tf.nn.max_pool_with_argmax(x, pool_size, strides, padding)
     # update shapes if necessary
-    if data_format == 'channels_first' and tf_data_format == 'NHWC':
+    if data_format == 'channels_first':
         # NHWC -> NCHW
         x = tf.transpose(x, (0, 3, 1, 2))
         # NHWC -> NCHW
@@ -67,7 +188,91 @@ def pool2d_argmax(x: 'Tensor', pool_size: tuple,
     return x, idx
 
 
-def unpool2d_argmax(x: 'Tensor', idx: 'Tensor', pool_size: tuple) -> 'Tuple':
+def pack_argmax(idx: 'Tensor', pool_size: tuple,
+    data_format: str=None,
+) -> 'Tensor':
+    """
+    Pack indexes from pool2d_argmax into their offsets in the pool window.
+
+    Args:
+        idx: the flat indexes from pool2d_argmax
+        pool_size: the pool_size used by the pooling operation
+        data_format: string, `"channels_last"` or `"channels_first"`.
+
+    Returns:
+        a uint8 tensor with the offset of each maximum in its pool window
+
+    Notes:
+        the strides of the pooling must equal the pool size and the input
+        dimensions must be divisible by it (i.e., non-overlapping windows)
+
+    """
+    # get the normalized data format
+    data_format = K.common.normalize_data_format(data_format)
+    # the indexes are computed in NHWC, NCHW -> NHWC
+    if data_format == 'channels_first':
+        idx = tf.transpose(idx, (0, 2, 3, 1))
+    # get the width and channels of the input to the pooling operation
+    shape = K.cast(K.shape(idx), 'int64')
+    width = shape[2] * pool_size[1]
+    channels = shape[3]
+    # unravel the flat index (y * width + x) * channels + c into y and x
+    position = idx // channels
+    y = position // width
+    x = position % width
+    # get the offset of the maximum in its pool window (fits in a byte)
+    offset = (y % pool_size[0]) * pool_size[1] + x % pool_size[1]
+    offset = K.cast(offset, 'uint8')
+    # NHWC -> NCHW
+    if data_format == 'channels_first':
+        offset = tf.transpose(offset, (0, 3, 1, 2))
+
+    return offset
+
+
+def unpack_argmax(offset: 'Tensor', pool_size: tuple,
+    data_format: str=None,
+) -> 'Tensor':
+    """
+    Unpack offsets from pack_argmax into the flat indexes of pool2d_argmax.
+
+    Args:
+        offset: the offsets of maxima in their pool windows from pack_argmax
+        pool_size: the pool_size used by the pooling operation
+        data_format: string, `"channels_last"` or `"channels_first"`.
+
+    Returns:
+        an int64 tensor of flat indexes matching the output of pool2d_argmax
+
+    """
+    # get the normalized data format
+    data_format = K.common.normalize_data_format(data_format)
+    # the indexes are computed in NHWC, NCHW -> NHWC
+    if data_format == 'channels_first':
+        offset = tf.transpose(offset, (0, 2, 3, 1))
+    offset = K.cast(offset, 'int64')
+    # get the shape of the output and the width of the input of the pooling
+    shape = K.cast(K.shape(offset), 'int64')
+    width = shape[2] * pool_size[1]
+    # create the coordinates of the pool windows and channels
+    rows = K.reshape(K.arange(shape[1], dtype='int64'), (1, -1, 1, 1))
+    cols = K.reshape(K.arange(shape[2], dtype='int64'), (1, 1, -1, 1))
+    channels = K.reshape(K.arange(shape[3], dtype='int64'), (1, 1, 1, -1))
+    # get the coordinates of the maxima from the windows and offsets
+    y = rows * pool_size[0] + offset // pool_size[1]
+    x = cols * pool_size[1] + offset % pool_size[1]
+    # ravel the coordinates into the flat index (y * width + x) * channels + c
+    idx = (y * width + x) * shape[3] + channels
+    # NHWC -> NCHW
+    if data_format == 'channels_first':
+        idx = tf.transpose(idx, (0, 3, 1, 2))
+
+    return idx
+
+
+def unpool2d_argmax(x: 'Tensor', idx: 'Tensor', pool_size: tuple,
+    data_format: str=None,
+) -> 'Tuple':
     """
     Un-pooling layer to complement pool2d_argmax.
 
@@ -75,6 +280,7 @@ def unpool2d_argmax(x: 'Tensor', idx: 'Tensor', pool_size: tuple) -> 'Tuple':
         x: input Tensor or variable
         idx: index matching the shape of x from the pooling operation
         pool_size: the pool_size used by the pooling operation
+        data_format: string, `"channels_last"` or `"channels_first"`.
 
     Returns:
         an un-pooled version of x using indexes in idx
@@ -84,6 +290,12 @@ def unpool2d_argmax(x: 'Tensor', idx: 'Tensor', pool_size: tuple) -> 'Tuple':
         https://github.com/tensorflow/tensorflow/issues/2169
 
     """
+    # get the normalized data format
+    data_format = K.common.normalize_data_format(data_format)
+    # the indexes are computed in NHWC, NCHW -> NHWC
+    if data_format == 'channels_first':
+        x = tf.transpose(x, (0, 2, 3, 1))
+        idx = tf.transpose(idx, (0, 2, 3, 1))
     # get the input shape of the tensor
     ins = K.shape(x)
     # create an index over the batches
@@ -107,13 +319,21 @@ def unpool2d_argmax(x: 'Tensor', idx: 'Tensor', pool_size: tuple) -> 'Tuple':
     # update the integer shape of the Keras Tensor
     ins = K.int_shape(idx)
     x.set_shape([ins[0], ins[1] * pool_size[0], ins[2] * pool_size[1], ins[3]])
+    # NHWC -> NCHW
+    if data_format == 'channels_first':
+        x = tf.transpose(x, (0, 3, 1, 2))
 
     return x
 
 
 # explicitly define the outward facing API of this module
 __all__ = [
+    all_finite.__name__,
     confusion_matrix.__name__,
+    configure_session.__name__,
+    pack_argmax.__name__,
     pool2d_argmax.__name__,
+    session_config.__name__,
+    unpack_argmax.__name__,
     unpool2d_argmax.__name__,
 ]
@@ -39,8 +39,11 @@ def evaluate(model, generator, steps: int,
         pred = model.predict(imgs)
         # if pred is a tuple or list, take the first network output
         y_pred = pred[0] if isinstance(pred, (tuple, list)) else pred
-        # extract the label using ArgMax and flatten into a 1D vector
-        y_true = np.argmax(y_true, axis=-1).flatten()
+        # extract the one-hot labels using ArgMax (sparse labels are as is)
+        if y_true.shape == y_pred.shape:
+            y_true = np.argmax(y_true, axis=-1)
+        # flatten the labels into 1D vectors
+        y_true = y_true.flatten()
         y_pred = np.argmax(y_pred, axis=-1).flatten()
         # calculate the confusion matrix and add to the accumulated matrix
         confusion += confusion_matrix(y_true, y_pred, list(range(num_classes)))
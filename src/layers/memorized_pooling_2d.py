@@ -1,14 +1,34 @@
 """A pooling layer that memorized the indexes."""
 from keras.layers import MaxPooling2D
+from ..backend.tensorflow_backend import pack_argmax
 from ..backend.tensorflow_backend import pool2d_argmax
 
 
 class MemorizedMaxPooling2D(MaxPooling2D):
     """A max pooling layer that memorizes the indexes."""
 
-    def __init__(self, *args, **kwargs):
-        """Initialize a new Memorized Max Pooling 2D layer."""
+    def __init__(self, *args, pack_indexes: bool=False, **kwargs):
+        """
+        Initialize a new Memorized Max Pooling 2D layer.
+
+        Args:
+            pack_indexes: whether to memorize the indexes as uint8 offsets in
+                          the pool windows instead of int64 flat indexes.
+                          this only saves memory without gradients (i.e., for
+                          inference), as the gradients of the pooling and
+                          up-sampling keep int64 indexes regardless
+
+        Returns:
+            None
+
+        """
         super(MemorizedMaxPooling2D, self).__init__(*args, **kwargs)
+        self.pack_indexes = pack_indexes
+        # packed indexes are offsets in non-overlapping windows
+        if self.pack_indexes and self.strides != self.pool_size:
+            raise ValueError('strides must be equal to pool_size')
+        if self.pack_indexes and self.pool_size[0] * self.pool_size[1] > 256:
+            raise ValueError('pool_size must have at most 256 elements')
         self.idx = None
 
     def _pooling_function(self, inputs, pool_size, strides, padding, data_format):
@@ -18,9 +38,20 @@ class MemorizedMaxPooling2D(MaxPooling2D):
             padding=padding,
             data_format=data_format,
         )
+        # memorize the indexes as byte offsets in the pool windows if set
+        if self.pack_indexes:
+            self.idx = pack_argmax(self.idx, pool_size,
+                data_format=data_format,
+            )
         # return the max pooling output
         return output
 
+    def get_config(self):
+        """Return the configuration of the layer."""
+        config = {'pack_indexes': self.pack_indexes}
+        base_config = super(MemorizedMaxPooling2D, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
+
 
 # explicitly define the outward facing API of this module
 __all__ = [MemorizedMaxPooling2D.__name__]
@@ -1,5 +1,6 @@
 """A 2D up-sampling layer that uses indexes from memorized pooling."""
 from keras.layers import UpSampling2D
+from ..backend.tensorflow_backend import unpack_argmax
 from ..backend.tensorflow_backend import unpool2d_argmax
 
 
@@ -21,13 +22,20 @@ class MemorizedUpsampling2D(UpSampling2D):
         size = pool.pool_size
         # call the super constructor
         super(MemorizedUpsampling2D, self).__init__(*args, size=size, **kwargs)
-        # set the index from the pool index calculation
+        # keep a reference to the pool and the index from its calculation
+        self.pool = pool
         self.idx = pool.idx
 
     def call(self, inputs):
+        idx = self.idx
+        # unpack the flat indexes from the memorized pool window offsets
+        if self.pool.pack_indexes:
+            idx = unpack_argmax(idx, self.size, data_format=self.data_format)
         # up-sample the inputs using the indexes from the max operation in
         # pooling of a certain size
-        return unpool2d_argmax(inputs, self.idx, self.size)
+        return unpool2d_argmax(inputs, idx, self.size,
+            data_format=self.data_format,
+        )
 
 
 # explicitly define the outward facing API of this module
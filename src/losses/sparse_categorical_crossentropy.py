@@ -0,0 +1,49 @@
+"""A Keras implementation of weighted sparse categorical cross entropy loss."""
+import numpy as np
+from keras import backend as K
+
+
+def build_sparse_categorical_crossentropy(weights=None):
+    """
+    Build a weighted sparse categorical crossentropy loss function.
+
+    Args:
+        weights: the weights to use for the loss function
+
+    Returns:
+        a callable sparse categorical crossentropy loss function
+
+    """
+    # create the weights tensor once instead of on every call of the loss
+    if weights is not None:
+        weights = K.constant(np.asarray(weights, dtype='float32'))
+
+    # the name must not match a loss in keras.losses, otherwise Keras checks
+    # the shape of the targets against the (one-hot) shape of the outputs
+    def weighted_sparse_categorical_crossentropy(y_true, y_pred):
+        """
+        Return the weighted sparse categorical crossentropy.
+
+        Args:
+            y_true: the ground truth labels as integers (i.e., not one-hot)
+            y_pred: the predicted labels from a network
+
+        Returns:
+            a symbolic tensor for the weighted crossentropy
+
+        """
+        # drop the trailing axis of the labels to match the pixels of y_pred
+        y_true = K.cast(K.reshape(y_true, K.shape(y_pred)[:-1]), 'int64')
+        # the backend uses the fused sparse Softmax crossentropy kernel
+        loss = K.sparse_categorical_crossentropy(y_true, y_pred)
+        # apply the weights of the ground truth classes if specified
+        if weights is not None:
+            loss = loss * K.gather(weights, y_true)
+
+        return loss
+
+    return weighted_sparse_categorical_crossentropy
+
+
+# explicitly define the outward facing API of this module
+__all__ = [build_sparse_categorical_crossentropy.__name__]
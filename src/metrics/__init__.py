@@ -1,6 +1,12 @@
 """Custom metrics for Keras."""
 from .categorical_accuracy import build_categorical_accuracy
+from .categorical_accuracy import build_sparse_categorical_accuracy
+from .mean_iou import MeanIoU
 
 
 # explicitly define the outward facing API of this package
-__all__ = [build_categorical_accuracy.__name__]
+__all__ = [
+    build_categorical_accuracy.__name__,
+    build_sparse_categorical_accuracy.__name__,
+    MeanIoU.__name__,
+]
@@ -1,7 +1,6 @@
 """A metric to calculate categorical accuracy."""
 import numpy as np
 from keras import backend as K
-from ..backend.tensorflow_backend import confusion_matrix
 
 
 def build_categorical_accuracy(weights=None):
@@ -15,6 +14,12 @@ def build_categorical_accuracy(weights=None):
         a callable categorical accuracy evaluation metric
 
     """
+    # create the (non-trainable) weights tensor once on the host instead of
+    # on every call of the metric
+    if weights is not None:
+        weights = np.asarray(weights, dtype=K.floatx())
+        weights = K.constant(weights, name='cat_acc_weights')
+
     def categorical_accuracy(y_true, y_pred):
         """
         Return a categorical accuracy tensor for label and prediction tensors.
@@ -27,26 +32,69 @@ def build_categorical_accuracy(weights=None):
             a tensor of the categorical accuracy between truth and predictions
 
         """
-        # get number of labels to calculate IoU for
-        num_classes = K.int_shape(y_pred)[-1]
-        # set the weights to all 1 if there are none specified
-        _weights = np.ones(num_classes) if weights is None else weights
         # convert the one-hot tensors into discrete label tensors with ArgMax
         y_true = K.flatten(K.argmax(y_true, axis=-1))
         y_pred = K.flatten(K.argmax(y_pred, axis=-1))
-        # calculate the confusion matrix of the ground truth and predictions
-        confusion = confusion_matrix(y_true, y_pred, num_classes=num_classes)
-        # confusion will return integers, but we need floats to multiply by eye
-        confusion = K.cast(confusion, K.floatx())
-        # extract the number of correct guesses from the diagonal
-        correct = _weights * K.sum(confusion * K.eye(num_classes), axis=-1)
-        # extract the number of total values per class from ground truth
-        total = _weights * K.sum(confusion, axis=-1)
-        # calculate the total accuracy
-        return K.sum(correct) / K.sum(total)
+        # determine which of the predictions match the ground truth
+        correct = K.cast(K.equal(y_true, y_pred), K.floatx())
+        # without weights the accuracy is the mean of the correct predictions
+        if weights is None:
+            return K.mean(correct)
+        # weight each pixel by the weight of its ground truth class
+        _weights = K.gather(weights, y_true)
+        # calculate the total weighted accuracy
+        return K.sum(_weights * correct) / K.sum(_weights)
 
     return categorical_accuracy
 
 
+def build_sparse_categorical_accuracy(weights=None):
+    """
+    Build a categorical accuracy method for sparse labels using given weights.
+
+    Args:
+        weights: the weights to use for the metric
+
+    Returns:
+        a callable sparse categorical accuracy evaluation metric
+
+    """
+    # create the (non-trainable) weights tensor once on the host instead of
+    # on every call of the metric
+    if weights is not None:
+        weights = np.asarray(weights, dtype=K.floatx())
+        weights = K.constant(weights, name='sparse_cat_acc_weights')
+
+    def sparse_categorical_accuracy(y_true, y_pred):
+        """
+        Return a categorical accuracy tensor for label and prediction tensors.
+
+        Args:
+            y_true: the ground truth labels as integers (i.e., not one-hot)
+            y_pred: the predicted labels from a loss network
+
+        Returns:
+            a tensor of the categorical accuracy between truth and predictions
+
+        """
+        # the labels are already discrete, so only ArgMax the predictions
+        y_true = K.flatten(K.cast(y_true, 'int64'))
+        y_pred = K.flatten(K.argmax(y_pred, axis=-1))
+        # determine which of the predictions match the ground truth
+        correct = K.cast(K.equal(y_true, y_pred), K.floatx())
+        # without weights the accuracy is the mean of the correct predictions
+        if weights is None:
+            return K.mean(correct)
+        # weight each pixel by the weight of its ground truth class
+        _weights = K.gather(weights, y_true)
+        # calculate the total weighted accuracy
+        return K.sum(_weights * correct) / K.sum(_weights)
+
+    return sparse_categorical_accuracy
+
+
 # explicitly define the outward facing API of this module
-__all__ = [build_categorical_accuracy.__name__]
+__all__ = [
+    build_categorical_accuracy.__name__,
+    build_sparse_categorical_accuracy.__name__,
+]
@@ -0,0 +1,87 @@
+"""A stateful metric to calculate the mean Intersection over Union (I/U)."""
+import numpy as np
+from keras import backend as K
+from keras.layers import Layer
+from ..backend.tensorflow_backend import confusion_matrix
+
+
+class MeanIoU(Layer):
+    """A stateful metric to calculate the mean I/U over an epoch."""
+
+    def __init__(self, num_classes: int,
+        sparse: bool=False,
+        name: str='mean_iou',
+        **kwargs
+    ):
+        """
+        Initialize a new mean I/U metric.
+
+        Args:
+            num_classes: the number of classes to calculate the I/U for
+            sparse: whether the ground truth labels are integers (not one-hot)
+            name: the name of the metric
+            kwargs: keyword arguments for the super constructor
+
+        Returns:
+            None
+
+        """
+        # initialize with the super constructor
+        super(MeanIoU, self).__init__(name=name, **kwargs)
+        # mark the metric as stateful so Keras resets it every epoch
+        self.stateful = True
+        # store the instance variables of this metric
+        self.num_classes = num_classes
+        self.sparse = sparse
+        # the confusion matrix accumulated over the batches of the epoch
+        shape = (num_classes, num_classes)
+        self.confusion = K.variable(np.zeros(shape), name='confusion')
+        # the identity to extract the diagonal of the confusion matrix
+        self.eye = K.constant(np.eye(num_classes))
+
+    def reset_states(self):
+        """Reset the accumulated confusion matrix."""
+        K.set_value(self.confusion, np.zeros(K.int_shape(self.confusion)))
+
+    def __call__(self, y_true, y_pred):
+        """
+        Return the mean I/U tensor for label and prediction tensors.
+
+        Args:
+            y_true: the ground truth labels to compare against
+            y_pred: the predicted labels from a loss network
+
+        Returns:
+            a tensor of the mean I/U of the epoch including this batch
+
+        """
+        # convert the one-hot tensors into discrete label tensors with ArgMax
+        if not self.sparse:
+            y_true = K.argmax(y_true, axis=-1)
+        y_true = K.flatten(K.cast(y_true, 'int64'))
+        y_pred = K.flatten(K.argmax(y_pred, axis=-1))
+        # calculate the confusion matrix of the batch (once for all classes)
+        confusion = confusion_matrix(y_true, y_pred,
+            num_classes=self.num_classes,
+        )
+        confusion = K.cast(confusion, K.floatx())
+        # accumulate the confusion matrix of the batch into the state
+        self.add_update(K.update_add(self.confusion, confusion),
+            inputs=[y_true, y_pred],
+        )
+        # the update may run after this tensor, so add the batch explicitly
+        confusion = self.confusion + confusion
+        # get |intersection| (AND) from the diagonal of the confusion matrix
+        intersection = K.sum(confusion * self.eye, axis=-1)
+        # get |union| (OR) from the predictions, ground truths, intersection
+        union = K.sum(confusion, axis=0) + K.sum(confusion, axis=-1)
+        union = union - intersection
+        # ignore classes that are neither in the ground truth or predictions
+        present = K.cast(K.greater(union, 0), K.floatx())
+        iou = intersection / K.maximum(union, 1)
+        # return the mean I/U over the present classes
+        return K.sum(iou * present) / K.maximum(K.sum(present), 1)
+
+
+# explicitly define the outward facing API of this module
+__all__ = [MeanIoU.__name__]
@@ -0,0 +1,10 @@
+"""Optimizers that wrap other Keras optimizers."""
+from .gradient_accumulator import GradientAccumulator
+from .loss_scale_optimizer import LossScaleOptimizer
+
+
+# explicitly define the outward facing API of this package
+__all__ = [
+    GradientAccumulator.__name__,
+    LossScaleOptimizer.__name__,
+]
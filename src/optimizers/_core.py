@@ -0,0 +1,98 @@
+"""Core methods for building optimizers that wrap other optimizers."""
+from contextlib import contextmanager
+from keras import backend as K
+from keras.optimizers import clip_norm
+
+
+def clip_gradients(optimizer, grads: list) -> list:
+    """
+    Clip gradients using the clipping arguments of an optimizer.
+
+    Args:
+        optimizer: the optimizer with the (optional) clipnorm and clipvalue
+        grads: the list of gradient tensors to clip
+
+    Returns:
+        the list of clipped gradient tensors
+
+    """
+    # clip the gradients by their global norm
+    if getattr(optimizer, 'clipnorm', 0) > 0:
+        norm = K.sqrt(sum([K.sum(K.square(g)) for g in grads]))
+        grads = [clip_norm(g, optimizer.clipnorm, norm) for g in grads]
+    # clip the gradients by value
+    if getattr(optimizer, 'clipvalue', 0) > 0:
+        value = optimizer.clipvalue
+        grads = [K.clip(g, -value, value) for g in grads]
+
+    return grads
+
+
+def get_updates_for(optimizer, grads: list, loss, params: list) -> list:
+    """
+    Return the updates of an optimizer using pre-computed gradients.
+
+    Args:
+        optimizer: the optimizer to get the updates from
+        grads: the gradients of the loss with respect to the parameters
+        loss: the loss tensor that the gradients were computed from
+        params: the list of parameters to update
+
+    Returns:
+        the list of update operations from the optimizer
+
+    """
+    # clip the gradients like the optimizer would clip its own
+    grads = clip_gradients(optimizer, grads)
+    # Keras optimizers get gradients through get_gradients, so temporarily
+    # override the method on the instance to return the given gradients
+    optimizer.get_gradients = lambda loss, params: grads
+    try:
+        return optimizer.get_updates(loss, params)
+    finally:
+        # delete the override to restore the method of the class
+        del optimizer.get_gradients
+
+
+@contextmanager
+def gate_updates(condition):
+    """
+    Create a context in which backend variable updates depend on a condition.
+
+    Args:
+        condition: a boolean scalar tensor. updates created in the context
+                   only change their variable when it is True
+
+    Returns:
+        a context manager (Keras optimizers update variables through the
+        backend update methods, which are gated within the context)
+
+    Notes:
+        the context replaces K.update, K.update_add, and K.update_sub on the
+        (shared) Keras backend module, i.e., every update created by any
+        code in the process while in the context is gated. only use it to
+        build the updates of an optimizer from a single thread. contexts
+        nest, gating updates on all of their conditions
+
+    """
+    # keep references to the backend methods to gate and restore them
+    update, update_add, update_sub = K.update, K.update_add, K.update_sub
+    K.update = lambda x, new_x: update(x, K.switch(condition, new_x, x))
+    K.update_add = lambda x, inc: update_add(x,
+        K.cast(condition, K.dtype(x)) * inc
+    )
+    K.update_sub = lambda x, dec: update_sub(x,
+        K.cast(condition, K.dtype(x)) * dec
+    )
+    try:
+        yield
+    finally:
+        K.update, K.update_add, K.update_sub = update, update_add, update_sub
+
+
+# explicitly define the outward facing API of this module
+__all__ = [
+    clip_gradients.__name__,
+    gate_updates.__name__,
+    get_updates_for.__name__,
+]
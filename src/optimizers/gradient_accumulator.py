@@ -0,0 +1,102 @@
+"""An optimizer that accumulates gradients over multiple batches."""
+from keras import backend as K
+from keras.optimizers import Optimizer
+from keras.optimizers import deserialize
+from keras.optimizers import get as get_optimizer
+from keras.optimizers import serialize
+from ._core import gate_updates
+from ._core import get_updates_for
+
+
+class GradientAccumulator(Optimizer):
+    """An optimizer that applies the mean gradient of multiple batches."""
+
+    def __init__(self, optimizer, accum_steps: int=2, **kwargs):
+        """
+        Initialize a new gradient accumulator.
+
+        Args:
+            optimizer: the optimizer to apply the accumulated gradients with
+                       (an instance, name, or configuration)
+            accum_steps: the number of batches to accumulate gradients over,
+                         i.e., the effective batch size is the batch size
+                         times accum_steps
+            kwargs: keyword arguments for the super constructor
+
+        Returns:
+            None
+
+        """
+        # ensure the number of steps is legal
+        if accum_steps < 1:
+            raise ValueError('accum_steps must be >= 1')
+        # initialize with the super constructor
+        super(GradientAccumulator, self).__init__(**kwargs)
+        # store the instance variables of this optimizer
+        self.optimizer = get_optimizer(optimizer)
+        self.accum_steps = accum_steps
+        with K.name_scope(self.__class__.__name__):
+            self.iterations = K.variable(0, dtype='int64', name='iterations')
+
+    @property
+    def lr(self):
+        """Return the learning rate of the wrapped optimizer."""
+        return self.optimizer.lr
+
+    def get_updates(self, loss, params):
+        """
+        Return the updates to minimize the loss with respect to parameters.
+
+        Args:
+            loss: the loss tensor to minimize
+            params: the list of parameters to update
+
+        Returns:
+            the list of update operations
+
+        """
+        grads = self.get_gradients(loss, params)
+        # create a variable to accumulate the gradients of each parameter in
+        shapes = [K.int_shape(p) for p in params]
+        accumulators = [K.zeros(shape) for shape in shapes]
+        # read the iteration once so the round boundary and the increment
+        # (which depends on the read) agree within a step
+        iterations = self.iterations + 1
+        # whether this step completes a round of accumulation
+        apply = K.equal(iterations % self.accum_steps, 0)
+        sums = [a + g for a, g in zip(accumulators, grads)]
+        self.updates = [K.update(self.iterations, iterations)]
+        # reset the accumulators when applying, otherwise accumulate
+        self.updates += [
+            K.update(a, K.switch(apply, K.zeros_like(s), s))
+            for a, s in zip(accumulators, sums)
+        ]
+        # apply the mean gradient with the wrapped optimizer at the end of
+        # each round, its updates (including slots) are no-ops otherwise
+        means = [s / self.accum_steps for s in sums]
+        with gate_updates(apply):
+            updates = get_updates_for(self.optimizer, means, loss, params)
+        self.updates += updates
+        self.weights = [self.iterations] + accumulators
+        self.weights += self.optimizer.weights
+
+        return self.updates
+
+    def get_config(self):
+        """Return the configuration of the optimizer."""
+        config = {
+            'optimizer': serialize(self.optimizer),
+            'accum_steps': self.accum_steps,
+        }
+        base_config = super(GradientAccumulator, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
+
+    @classmethod
+    def from_config(cls, config):
+        """Return a new optimizer from a configuration."""
+        optimizer = deserialize(config.pop('optimizer'))
+        return cls(optimizer, **config)
+
+
+# explicitly define the outward facing API of this module
+__all__ = [GradientAccumulator.__name__]
@@ -0,0 +1,111 @@
+"""An optimizer that scales the loss for mixed precision training."""
+from keras import backend as K
+from keras.optimizers import Optimizer
+from keras.optimizers import deserialize
+from keras.optimizers import get as get_optimizer
+from keras.optimizers import serialize
+from ..backend.tensorflow_backend import all_finite
+from ._core import gate_updates
+from ._core import get_updates_for
+
+
+class LossScaleOptimizer(Optimizer):
+    """An optimizer that dynamically scales the loss of another optimizer."""
+
+    def __init__(self, optimizer,
+        initial_scale: float=2.0**15,
+        growth_interval: int=2000,
+        **kwargs
+    ):
+        """
+        Initialize a new loss scale optimizer.
+
+        Args:
+            optimizer: the optimizer to apply the unscaled gradients with
+                       (an instance, name, or configuration)
+            initial_scale: the initial scale to multiply the loss by
+            growth_interval: the number of steps without overflow after which
+                             the scale is doubled (it halves on overflow)
+            kwargs: keyword arguments for the super constructor
+
+        Returns:
+            None
+
+        """
+        # initialize with the super constructor
+        super(LossScaleOptimizer, self).__init__(**kwargs)
+        # store the instance variables of this optimizer
+        self.optimizer = get_optimizer(optimizer)
+        self.initial_scale = initial_scale
+        self.growth_interval = growth_interval
+        with K.name_scope(self.__class__.__name__):
+            self.loss_scale = K.variable(initial_scale, name='loss_scale')
+            self.good_steps = K.variable(0, dtype='int64', name='good_steps')
+
+    @property
+    def lr(self):
+        """Return the learning rate of the wrapped optimizer."""
+        return self.optimizer.lr
+
+    def get_updates(self, loss, params):
+        """
+        Return the updates to minimize the loss with respect to parameters.
+
+        Args:
+            loss: the loss tensor to minimize
+            params: the list of parameters to update
+
+        Returns:
+            the list of update operations
+
+        """
+        # get the gradients of the scaled loss and unscale them
+        grads = self.get_gradients(loss * self.loss_scale, params)
+        grads = [g / self.loss_scale for g in grads]
+        # zero the gradients of the step if any of them overflowed
+        finite = all_finite(grads)
+        grads = [K.switch(finite, g, K.zeros_like(g)) for g in grads]
+        # apply the unscaled gradients with the wrapped optimizer, skipping
+        # its updates (e.g., iterations, momentum, accumulation) on overflow
+        with gate_updates(finite):
+            self.updates = get_updates_for(self.optimizer, grads, loss, params)
+        # count the steps without overflow (resetting on overflow)
+        good_steps = K.switch(finite,
+            self.good_steps + 1,
+            K.zeros_like(self.good_steps),
+        )
+        grow = K.greater_equal(good_steps, self.growth_interval)
+        # double the scale after enough good steps, halve it on overflow
+        loss_scale = K.switch(finite,
+            K.switch(grow, self.loss_scale * 2, self.loss_scale),
+            K.maximum(self.loss_scale / 2, 1.0),
+        )
+        good_steps = K.switch(grow, K.zeros_like(good_steps), good_steps)
+        self.updates += [
+            K.update(self.loss_scale, loss_scale),
+            K.update(self.good_steps, good_steps),
+        ]
+        self.weights = [self.loss_scale, self.good_steps]
+        self.weights += self.optimizer.weights
+
+        return self.updates
+
+    def get_config(self):
+        """Return the configuration of the optimizer."""
+        config = {
+            'optimizer': serialize(self.optimizer),
+            'initial_scale': self.initial_scale,
+            'growth_interval': self.growth_interval,
+        }
+        base_config = super(LossScaleOptimizer, self).get_config()
+        return dict(list(base_config.items()) + list(config.items()))
+
+    @classmethod
+    def from_config(cls, config):
+        """Return a new optimizer from a configuration."""
+        optimizer = deserialize(config.pop('optimizer'))
+        return cls(optimizer, **config)
+
+
+# explicitly define the outward facing API of this module
+__all__ = [LossScaleOptimizer.__name__]
@@ -1,53 +1,120 @@
 """An implementation of SegNet (and Bayesian alternative)."""
-from keras.applications.vgg16 import VGG16
+import json
+import os
+import tempfile
+import time
+import zipfile
+import h5py
+import numpy as np
+from keras import backend as K
+from keras.backend.tensorflow_backend import tf
 from keras.layers import Activation
 from keras.layers import BatchNormalization
 from keras.layers import Conv2D
 from keras.layers import Dropout
 from keras.layers import Input
 from keras.layers import Lambda
+from keras.layers import Permute
 from keras.models import Model
 from keras.optimizers import SGD
 from keras.regularizers import l2
+from keras.utils.data_utils import get_file
+from .backend.tensorflow_backend import configure_session
+from .backend.tensorflow_backend import session_config
 from .layers import LocalContrastNormalization
 from .layers import MemorizedMaxPooling2D
 from .layers import MemorizedUpsampling2D
 from .losses import build_categorical_crossentropy
+from .losses import build_sparse_categorical_crossentropy
 from .metrics import build_categorical_accuracy
+from .metrics import build_sparse_categorical_accuracy
+from .metrics import MeanIoU
+from .optimizers import GradientAccumulator
+from .optimizers import LossScaleOptimizer
 
 
 # static arguments used for all convolution layers in SegNet
 _CONV = dict(
     kernel_initializer='he_uniform',
-    kernel_regularizer=l2(5e-4),
 )
 
 
-def _conv_bn_relu(x, num_filters: int):
+# static arguments used for all batch normalization layers in SegNet. the
+# channel axis is set by the data format; normalizing over the channel axis
+# of a 4D input lets Keras select the fused kernel
+_BN = dict(
+    momentum=0.99,
+    epsilon=1e-3,
+)
+
+
+# the number of filters in each block of each stage of the SegNet encoder
+_ENCODER = [2 * [64], 2 * [128], 3 * [256], 3 * [512], 3 * [512]]
+
+
+# the file to cache the fastest data format per configuration and device in
+_DATA_FORMAT_CACHE = os.path.join(
+    os.path.expanduser('~'), '.keras', 'segnet_data_format.json'
+)
+
+
+def _conv_bn_relu(x, num_filters: int,
+    regularizer=None,
+    data_format: str='channels_last',
+    freeze_bn: bool=False,
+):
     """
     Append a convolution + batch normalization + ReLu block to an input tensor.
 
     Args:
         x: the input tensor to append this dense block to
         num_filters: the number of filters in the convolutional layer
+        regularizer: the (shared) regularizer for the convolutional kernel
+        data_format: the data format of the tensor ('channels_last' or
+                     'channels_first')
+        freeze_bn: whether to freeze the batch normalization, i.e., always
+                   use the moving statistics and never update parameters
 
     Returns:
         a tensor with convolution + batch normalization + ReLu block added
 
     """
-    x = Conv2D(num_filters, kernel_size=(3, 3), padding='same', **_CONV)(x)
-    x = BatchNormalization()(x)
+    x = Conv2D(num_filters,
+        kernel_size=(3, 3),
+        padding='same',
+        kernel_regularizer=regularizer,
+        data_format=data_format,
+        **_CONV
+    )(x)
+    axis = 1 if data_format == 'channels_first' else -1
+    # a frozen normalization is a fixed per-channel affine transform in both
+    # training and inference (i.e., training=False)
+    if freeze_bn:
+        bn = BatchNormalization(axis=axis, trainable=False, **_BN)
+        x = bn(x, training=False)
+    else:
+        x = BatchNormalization(axis=axis, **_BN)(x)
     x = Activation('relu')(x)
     return x
 
 
-def _encode(x, nums_filters: list):
+def _encode(x, nums_filters: list,
+    regularizer=None,
+    data_format: str='channels_last',
+    freeze_bn: bool=False,
+    name: str='encoder',
+):
     """
     Append a encoder block with a given size and number of filters.
 
     Args:
         x: the input tensor to append this encoder block to
         num_filters: a list of the number of filters for each block
+        regularizer: the (shared) regularizer for the convolutional kernels
+        data_format: the data format of the tensor ('channels_last' or
+                     'channels_first')
+        freeze_bn: whether to freeze the batch normalization layers
+        name: the name of the scope to group the operations of the block in
 
     Returns:
         a tuple of:
@@ -55,18 +122,31 @@ def _encode(x, nums_filters: list):
         - the pooling layer to get indexes from for up-sampling
 
     """
-    # loop over the filters list to apply convolution + BN + ReLu blocks
-    for num_filters in nums_filters:
-        x = _conv_bn_relu(x, num_filters)
-    # create a max pooling layer to keep indexes from for up-sampling later
-    pool = MemorizedMaxPooling2D(pool_size=(2, 2), strides=(2, 2))
-    # pass the block output through the special pooling layer
-    x = pool(x)
+    # group the operations of the block in a scope of the graph
+    with K.name_scope(name):
+        # loop over the filters list to apply convolution + BN + ReLu blocks
+        for num_filters in nums_filters:
+            x = _conv_bn_relu(x, num_filters,
+                regularizer=regularizer,
+                data_format=data_format,
+                freeze_bn=freeze_bn,
+            )
+        # create a max pooling layer to keep indexes for up-sampling later
+        pool = MemorizedMaxPooling2D(pool_size=(2, 2),
+            strides=(2, 2),
+            data_format=data_format,
+        )
+        # pass the block output through the special pooling layer
+        x = pool(x)
     # return the output tensor and reference to pooling layer to get indexes
     return x, pool
 
 
-def _decode(x, pool: MemorizedMaxPooling2D, nums_filters: list):
+def _decode(x, pool: MemorizedMaxPooling2D, nums_filters: list,
+    regularizer=None,
+    data_format: str='channels_last',
+    name: str='decoder',
+):
     """
     Append a decoder block with a given size and number of filters.
 
@@ -74,66 +154,507 @@ def _decode(x, pool: MemorizedMaxPooling2D, nums_filters: list):
         x: the input tensor to append this decoder block to
         pool: the corresponding memorized pooling layer to reference indexes
         num_filters: a list of the number of filters for each block
+        regularizer: the (shared) regularizer for the convolutional kernels
+        data_format: the data format of the tensor ('channels_last' or
+                     'channels_first')
+        name: the name of the scope to group the operations of the block in
 
     Returns:
         a tensor with up-sampling followed by convolution blocks
 
     """
-    # up-sample using the max pooling indexes
-    x = MemorizedUpsampling2D(pool=pool)(x)
-    # loop over the filters list to apply convolution + BN + ReLu blocks
-    for num_filters in nums_filters:
-        x = _conv_bn_relu(x, num_filters)
+    # group the operations of the block in a scope of the graph
+    with K.name_scope(name):
+        # up-sample using the max pooling indexes
+        x = MemorizedUpsampling2D(pool=pool, data_format=data_format)(x)
+        # loop over the filters list to apply convolution + BN + ReLu blocks
+        for num_filters in nums_filters:
+            x = _conv_bn_relu(x, num_filters,
+                regularizer=regularizer,
+                data_format=data_format,
+            )
     return x
 
 
-def _classify(x, num_classes: int):
+def _classify(x, num_classes: int,
+    regularizer=None,
+    data_format: str='channels_last',
+):
     """
     Add a Softmax classification block to an input CNN.
 
     Args:
         x: the input tensor to append this classification block to (CNN)
         num_classes: the number of classes to predict with Softmax
+        regularizer: the (shared) regularizer for the convolutional kernel
+        data_format: the data format of the tensor ('channels_last' or
+                     'channels_first')
 
     Returns:
         a tensor with dense convolution followed by Softmax activation
 
     """
     # dense convolution (1 x 1) to filter logits for each class
-    x = Conv2D(num_classes, kernel_size=(1, 1), padding='valid', **_CONV)(x)
+    x = Conv2D(num_classes,
+        kernel_size=(1, 1),
+        padding='valid',
+        kernel_regularizer=regularizer,
+        data_format=data_format,
+        **_CONV
+    )(x)
+    # move the channels back to the last axis for the Softmax, NCHW -> NHWC
+    if data_format == 'channels_first':
+        x = Permute((2, 3, 1))(x)
     # Softmax activation to convert the logits to probability vectors
     x = Activation('softmax')(x)
     return x
 
 
-def _transfer_vgg16_encoder(model: Model) -> None:
+# the URL and MD5 hash of the VGG16 (ImageNet) weights without the top layers
+_VGG16_WEIGHTS_URL = (
+    'https://github.com/fchollet/deep-learning-models/releases/download/'
+    'v0.1/vgg16_weights_tf_dim_ordering_tf_kernels_notop.h5'
+)
+_VGG16_WEIGHTS_HASH = '6d6bbae143d832006294945121d1f1fc'
+
+
+# the names of the convolutional layers of VGG16 in order
+_VGG16_CONV_NAMES = [
+    'block{}_conv{}'.format(block, conv)
+    for block, size in enumerate([2, 2, 3, 3, 3], 1)
+    for conv in range(1, size + 1)
+]
+
+
+# the weights of the VGG16 convolutional layers, loaded once on first use
+_VGG16_CONV_WEIGHTS = None
+
+
+def _load_vgg16_conv_weights(weights_cache: str) -> list:
+    """
+    Load the weights of the convolutional layers of VGG16 from a cache file.
+
+    Args:
+        weights_cache: the .npz file saved by _save_vgg16_conv_weights
+
+    Returns:
+        a list with a list of the kernel and bias of each convolutional layer
+        (None if the file doesn't exist, is unreadable, or is stale)
+
+    """
+    try:
+        with np.load(weights_cache) as cache:
+            # the cache is stale if saved from another VGG16 weights file
+            if str(cache['weights_hash']) != _VGG16_WEIGHTS_HASH:
+                return None
+            arrays = [
+                cache['arr_{}'.format(i)]
+                for i in range(2 * len(_VGG16_CONV_NAMES))
+            ]
+    # a missing, truncated, or otherwise invalid file is a cache miss
+    except (EOFError, OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+    return [arrays[i:i + 2] for i in range(0, len(arrays), 2)]
+
+
+def _save_vgg16_conv_weights(weights_cache: str, weights: list) -> None:
+    """
+    Save the weights of the convolutional layers of VGG16 to a cache file.
+
+    Args:
+        weights_cache: the .npz file to save the weights to
+        weights: a list with a list of the kernel and bias of each layer
+
+    Returns:
+        None
+
+    """
+    arrays = [w for layer in weights for w in layer]
+    # write to a temporary file and move it into place so concurrent
+    # processes never see a partially written cache. the cache is optional,
+    # so failing to write it (e.g., a read-only directory) isn't an error
+    try:
+        directory = os.path.dirname(os.path.abspath(weights_cache))
+        os.makedirs(directory, exist_ok=True)
+        handle, temp = tempfile.mkstemp(suffix='.npz', dir=directory)
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                np.savez(temp_file, *arrays, weights_hash=_VGG16_WEIGHTS_HASH)
+            os.replace(temp, weights_cache)
+        except BaseException:
+            os.remove(temp)
+            raise
+    except OSError:
+        pass
+
+
+def _vgg16_conv_weights(weights_cache: str=None) -> list:
+    """
+    Return the weights of the convolutional layers of VGG16 (ImageNet).
+
+    Args:
+        weights_cache: an optional .npz file to load the weights from (or to
+                       save them to if it doesn't exist yet)
+
+    Returns:
+        a list with a list of the kernel and bias of each convolutional layer
+
+    """
+    global _VGG16_CONV_WEIGHTS
+    weights = _VGG16_CONV_WEIGHTS
+    # whether to write the weights to the cache for subsequent processes
+    save = weights_cache is not None
+    # the weights are already loaded by this process, so only write a cache
+    # that doesn't exist yet (e.g., a cache given after the first load)
+    if weights is not None:
+        save = save and not os.path.exists(weights_cache)
+    # load the weights from the cache of a previous process if it's valid
+    elif weights_cache is not None:
+        weights = _load_vgg16_conv_weights(weights_cache)
+        save = weights is None
+    # read the weights from the (cached) HDF5 file. this avoids building a
+    # VGG16 model just to extract its weights
+    if weights is None:
+        path = get_file(_VGG16_WEIGHTS_URL.split('/')[-1], _VGG16_WEIGHTS_URL,
+            cache_subdir='models',
+            file_hash=_VGG16_WEIGHTS_HASH,
+        )
+        weights = []
+        with h5py.File(path, 'r') as weights_file:
+            for name in _VGG16_CONV_NAMES:
+                group = weights_file[name]
+                # the names of the kernel and bias datasets of the layer
+                names = [
+                    n.decode('utf8') if hasattr(n, 'decode') else n
+                    for n in group.attrs['weight_names']
+                ]
+                weights.append([np.asarray(group[n]) for n in names])
+    # save the weights to the cache for subsequent processes
+    if save:
+        _save_vgg16_conv_weights(weights_cache, weights)
+    _VGG16_CONV_WEIGHTS = weights
+
+    return _VGG16_CONV_WEIGHTS
+
+
+def _transfer_vgg16_encoder(model: Model, weights_cache: str=None) -> None:
     """
     Transfer trained VGG16 weights (ImageNet) to a SegNet encoder.
 
     Args:
         model: the SegNet model to transfer encoder weights to
+        weights_cache: an optional .npz file to cache the VGG16 weights in
 
     Returns:
         None
 
     """
-    # load the trained VGG16 model using ImageNet weights
-    vgg16 = VGG16(include_top=False)
-    # extract all the convolutional layers (encoder layers) from VGG16
-    vgg16_conv = [layer for layer in vgg16.layers if isinstance(layer, Conv2D)]
+    # get the weights of the convolutional layers (encoder layers) of VGG16
+    vgg16_conv = _vgg16_conv_weights(weights_cache)
     # extract all convolutional layers from SegNet
     model_conv = [layer for layer in model.layers if isinstance(layer, Conv2D)]
-    # iterate over the VGG16 layers to replace the SegNet encoder weights
-    for idx, layer in enumerate(vgg16_conv):
-        model_conv[idx].set_weights(layer.get_weights())
+    # iterate over the VGG16 weights to replace the SegNet encoder weights
+    for idx, weights in enumerate(vgg16_conv):
+        # ensure the encoder architecture matches VGG16 before transferring
+        shapes = [w.shape for w in model_conv[idx].get_weights()]
+        expected = [w.shape for w in weights]
+        if shapes != expected:
+            msg = 'layer {} has weight shapes {}, expected {} from VGG16'
+            msg = msg.format(model_conv[idx].name, shapes, expected)
+            raise ValueError(msg)
+        model_conv[idx].set_weights(weights)
+
+
+# the name of the device to select the data format for, found on first use
+_DEVICE_NAME = None
+
+
+def _device_name() -> str:
+    """Return the name of the first GPU (or 'CPU' if there is no GPU)."""
+    global _DEVICE_NAME
+    # return the name if already found by this process
+    if _DEVICE_NAME is not None:
+        return _DEVICE_NAME
+    from tensorflow.python.client import device_lib
+    # get the physical description of the GPUs visible to TensorFlow
+    devices = device_lib.list_local_devices()
+    gpus = [d.physical_device_desc for d in devices if d.device_type == 'GPU']
+    _DEVICE_NAME = gpus[0] if gpus else 'CPU'
+
+    return _DEVICE_NAME
+
+
+def _benchmark_data_format(image_shape: tuple, data_format: str,
+    config=None,
+    steps: int=5,
+) -> float:
+    """
+    Return the time of a forward pass through the encoder in a data format.
+
+    Args:
+        image_shape: the image shape to benchmark the encoder for
+        data_format: the data format to benchmark ('channels_last' or
+                     'channels_first')
+        config: the configuration of the session to benchmark in (e.g., with
+                mixed precision or XLA from session_config)
+        steps: the number of forward passes to average over
+
+    Returns:
+        the mean seconds per forward pass (inf if the format is unsupported)
+
+    """
+    # build the encoder in a separate graph and session to keep the probe out
+    # of the graph (and session) of the model being built
+    with tf.Graph().as_default(), tf.Session(config=config):
+        inputs = Input(image_shape)
+        x = inputs
+        # NHWC -> NCHW
+        if data_format == 'channels_first':
+            x = Permute((3, 1, 2))(x)
+        for nums_filters in _ENCODER:
+            x, _ = _encode(x, nums_filters, data_format=data_format)
+        encoder = Model(inputs=[inputs], outputs=[x])
+        # create a synthetic batch of 8-bit images
+        batch = np.random.uniform(0, 255, (1,) + tuple(image_shape))
+        # warm up (and check support for the data format on this device)
+        try:
+            encoder.predict(batch)
+        except tf.errors.OpError:
+            return float('inf')
+        # time the forward passes through the encoder
+        start = time.time()
+        for _ in range(steps):
+            encoder.predict(batch)
+
+        return (time.time() - start) / steps
+
+
+def _select_data_format(image_shape: tuple,
+    precision: str='float32',
+    jit_compile: bool=False,
+) -> str:
+    """
+    Return the fastest data format for SegNet on the current device.
+
+    Args:
+        image_shape: the image shape to create the model for
+        precision: the precision of the model ('float32' or 'mixed_float16')
+        jit_compile: whether the model is compiled with XLA
+
+    Returns:
+        the faster data format of 'channels_last' and 'channels_first'
+
+    """
+    # load the cache of previously selected data formats
+    try:
+        with open(_DATA_FORMAT_CACHE) as cache_file:
+            cache = json.load(cache_file)
+    # a missing, truncated, or otherwise invalid file is an empty cache
+    except (OSError, ValueError):
+        cache = dict()
+    if not isinstance(cache, dict):
+        cache = dict()
+    # return the cached data format if this configuration has been probed
+    key = (tuple(image_shape), precision, jit_compile, _device_name())
+    key = repr(key)
+    if key in cache:
+        return cache[key]
+    # benchmark the encoder in each data format (in a session configured
+    # like the one of the model) and select the fastest
+    config = session_config(
+        auto_mixed_precision=precision == 'mixed_float16',
+        jit_compile=jit_compile,
+    )
+    data_formats = ['channels_last', 'channels_first']
+    times = [
+        _benchmark_data_format(image_shape, f, config=config)
+        for f in data_formats
+    ]
+    cache[key] = data_formats[int(np.argmin(times))]
+    # write the selection back to the cache through a temporary file so
+    # concurrent processes never see a partially written cache. the cache is
+    # optional, so failing to write it isn't an error
+    try:
+        directory = os.path.dirname(_DATA_FORMAT_CACHE)
+        os.makedirs(directory, exist_ok=True)
+        handle, temp = tempfile.mkstemp(suffix='.json', dir=directory)
+        try:
+            with os.fdopen(handle, 'w') as cache_file:
+                json.dump(cache, cache_file, indent=4)
+            os.replace(temp, _DATA_FORMAT_CACHE)
+        except BaseException:
+            os.remove(temp)
+            raise
+    except OSError:
+        pass
+
+    return cache[key]
+
+
+# the name and scale of the layer that normalizes 8-bit pixels to [0,1]
+_PIXEL_NORM = 'pixel_norm'
+_PIXEL_SCALE = 1 / 255.0
+
+
+def preprocess_batch(x):
+    """
+    Convert a batch of 8-bit images to floats in [0, 1].
+
+    Args:
+        x: the batch of images as a NumPy array or a TensorFlow tensor (e.g.,
+           in a tf.data map function)
+
+    Returns:
+        the batch of images scaled to [0, 1] as 32-bit floats
+
+    """
+    # handle symbolic tensors from input pipelines with the backend
+    if K.is_tensor(x):
+        return K.cast(x, 'float32') * _PIXEL_SCALE
+
+    return np.asarray(x, dtype='float32') * _PIXEL_SCALE
+
+
+def _fold_batch_norm(conv: Conv2D, bn: BatchNormalization,
+    input_scale: float=1.0,
+) -> list:
+    """
+    Fold the inference statistics of a batch normalization into a convolution.
+
+    Args:
+        conv: the convolutional layer that feeds the batch normalization
+        bn: the batch normalization layer to fold into the convolution
+        input_scale: a scale of the inputs to fold into the kernel too
+
+    Returns:
+        a list of the folded kernel and bias to set on a biased convolution
+
+    """
+    # unwrap the kernel and bias (zeros if the convolution has no bias)
+    weights = conv.get_weights()
+    kernel = weights[0]
+    bias = weights[1] if conv.use_bias else np.zeros(kernel.shape[-1])
+    # unwrap the affine parameters and moving statistics of the normalization
+    gamma = K.get_value(bn.gamma) if bn.scale else 1.0
+    beta = K.get_value(bn.beta) if bn.center else 0.0
+    mean = K.get_value(bn.moving_mean)
+    variance = K.get_value(bn.moving_variance)
+    # calculate the per-channel scale of the normalization
+    scale = gamma / np.sqrt(variance + bn.epsilon)
+    # scale the output channels of the kernel and shift the bias
+    kernel = kernel * input_scale * scale.reshape(1, 1, 1, -1)
+    bias = (bias - mean) * scale + beta
+
+    return [kernel, bias]
+
+
+def fuse_bn_for_inference(model: Model) -> Model:
+    """
+    Fold every convolution + batch normalization pair of a SegNet model.
+
+    Args:
+        model: the trained SegNet model to fold batch normalization out of,
+               i.e., a model from segnet with its trained weights loaded
+
+    Returns:
+        an un-compiled copy of the model with biased convolutions in place of
+        each convolution + batch normalization pair (for inference only). a
+        ReLu following a pair becomes the activation of the convolution so
+        TensorFlow can run convolution + bias + ReLu as a single kernel. the
+        pixel normalization of 8-bit inputs is folded into the kernel of the
+        first convolution and the pooling indexes are packed into bytes
+
+    Notes:
+        the folded weights are computed from the moving statistics of the
+        model, so fold after training (or loading weights). the copy has
+        fewer layers with weights than a SegNet model, so weights saved
+        from a SegNet model can't be loaded into it
+
+    """
+    # create a new input layer matching the input of the model
+    inputs = Input(batch_shape=model.layers[0].batch_input_shape,
+        name=model.layers[0].name,
+    )
+    x = inputs
+    # a mapping of pooling layers in model to their copies in the new graph
+    pools = dict()
+    # the scale of the inputs to fold into the next convolution
+    input_scale = 1.0
+    # iterate over the layers (SegNet is a chain) skipping the input layer
+    layers = model.layers[1:]
+    idx = 0
+    while idx < len(layers):
+        layer = layers[idx]
+        following = layers[idx + 1] if idx + 1 < len(layers) else None
+        # fold the pixel normalization into the first convolution if only
+        # permutations separate them (a scale commutes with a permutation)
+        if isinstance(layer, Lambda) and layer.name == _PIXEL_NORM:
+            jdx = idx + 1
+            while jdx < len(layers) and isinstance(layers[jdx], Permute):
+                jdx += 1
+            if (jdx + 1 < len(layers) and
+                isinstance(layers[jdx], Conv2D) and
+                isinstance(layers[jdx + 1], BatchNormalization)):
+                input_scale = _PIXEL_SCALE
+                idx += 1
+                continue
+        # fold the normalization into the convolution if it's the sole consumer
+        if (isinstance(layer, Conv2D) and
+            isinstance(following, BatchNormalization) and
+            following.get_input_at(0) is layer.get_output_at(0)):
+            config = layer.get_config()
+            config['use_bias'] = True
+            folded = 2
+            # fold the ReLu into the convolution if it's the sole consumer
+            after = layers[idx + 2] if idx + 2 < len(layers) else None
+            if (isinstance(after, Activation) and
+                after.get_config()['activation'] == 'relu' and
+                after.get_input_at(0) is following.get_output_at(0)):
+                config['activation'] = 'relu'
+                folded = 3
+            conv = Conv2D.from_config(config)
+            x = conv(x)
+            conv.set_weights(_fold_batch_norm(layer, following, input_scale))
+            input_scale = 1.0
+            idx += folded
+            continue
+        # copy the memorized layers so the up-sampling references new indexes
+        if isinstance(layer, MemorizedMaxPooling2D):
+            # memorize the indexes as bytes, i.e., 8x less memory than the
+            # int64 indexes needed for the gradients of training
+            config = layer.get_config()
+            config['pack_indexes'] = True
+            pools[layer] = MemorizedMaxPooling2D.from_config(config)
+            x = pools[layer](x)
+        elif isinstance(layer, MemorizedUpsampling2D):
+            x = MemorizedUpsampling2D(pool=pools[layer.pool],
+                data_format=layer.data_format,
+                name=layer.name,
+            )(x)
+        # reuse any other layer, passing the arguments of the original call
+        else:
+            x = layer(x, **layer._inbound_nodes[0].arguments)
+        idx += 1
+
+    return Model(inputs=[inputs], outputs=[x], name=model.name)
 
 
 def segnet(image_shape: tuple, num_classes: int,
     class_weights=None,
     lcn: bool=True,
     dropout_rate: float=None,
-    optimizer=SGD(lr=0.1, momentum=0.9),
+    optimizer=None,
     pretrain_encoder: bool=True,
+    sparse_labels: bool=False,
+    scale_inputs: bool=True,
+    l2_coeff: float=5e-4,
+    data_format: str='auto',
+    precision: str='float32',
+    freeze_encoder_bn: bool=False,
+    accum_steps: int=1,
+    jit_compile: bool=False,
+    weights_cache: str=None,
 ) -> Model:
     """
     Build a SegNet model for the given image shape.
@@ -144,11 +665,50 @@ def segnet(image_shape: tuple, num_classes: int,
         class_weights: the weights for each class
         lcn: whether to use local contrast normalization on inputs
         dropout_rate: the dropout rate to use for permanent dropout
-        optimizer: the optimizer for training the network
+        optimizer: the optimizer for training the network (defaults to a
+                   new SGD with learning rate 0.1 and momentum 0.9)
         pretrain_encoder: whether to initialize the encoder from VGG16
+        sparse_labels: whether the targets are integer labels with shape
+                       (batch, height, width, 1) instead of one-hot vectors
+        scale_inputs: whether the model accepts 8-bit inputs, scaling them
+                      to [0,1] in the graph (fuse_bn_for_inference folds the
+                      scale into the first convolution). if False, inputs
+                      must already be in [0,1], e.g., scaled in the input
+                      pipeline with preprocess_batch
+        l2_coeff: the coefficient of the L2 penalty on convolutional kernels
+        data_format: the data format of the convolutional layers, one of
+                     'channels_last', 'channels_first', or 'auto' to select
+                     the faster on this device with a (cached) benchmark.
+                     inputs and outputs are channels last regardless
+        precision: 'float32' or 'mixed_float16' to compute convolutions in
+                   float16 using the automatic mixed precision graph rewrite
+                   (see session_config). mixed precision wraps
+                   the optimizer in a LossScaleOptimizer, i.e., dynamic loss
+                   scaling is always on
+        freeze_encoder_bn: whether to freeze the batch normalization layers
+                           of the encoder (no statistics or parameter
+                           updates). VGG16 has no batch normalization, so
+                           frozen layers keep their initial identity
+                           statistics unless weights are loaded into them
+        accum_steps: the number of batches to accumulate gradients over
+                     before applying them (see GradientAccumulator), i.e.,
+                     the effective batch size is batch size * accum_steps
+        jit_compile: whether to compile the graph with XLA (see
+                     session_config)
+        weights_cache: an optional .npz file to cache the VGG16 encoder
+                       weights in across processes. Keras already caches the
+                       HDF5 weights in ~/.keras/models, so this only saves
+                       reading them from HDF5
 
     Returns:
-        a compiled model of SegNet
+        a compiled model of SegNet. to deploy a trained model, fold its batch
+        normalization into the convolutions with fuse_bn_for_inference
+
+    Notes:
+        precision and jit_compile are options of the Keras session. building
+        a model with other options than the previous build replaces the
+        session, which invalidates every model built earlier in the process
+        (their variables lose their values)
 
     """
     # ensure the image shape is legal for the architecture
@@ -158,13 +718,50 @@ def segnet(image_shape: tuple, num_classes: int,
         if dim % div:
             msg = 'dimension ({}) must be divisible by {}'.format(dim, div)
             raise ValueError(msg)
+    # ensure the precision is legal
+    if precision not in {'float32', 'mixed_float16'}:
+        msg = 'precision ({}) must be float32 or mixed_float16'
+        raise ValueError(msg.format(precision))
+    # configure mixed precision and XLA before creating any variables (this
+    # replaces the session if the options differ from those of the current
+    # session)
+    configure_session(
+        auto_mixed_precision=precision == 'mixed_float16',
+        jit_compile=jit_compile,
+    )
+    # create a new optimizer for each model (optimizers hold variables)
+    if optimizer is None:
+        optimizer = SGD(lr=0.1, momentum=0.9)
+    # accumulate gradients over multiple batches if set
+    if accum_steps > 1:
+        optimizer = GradientAccumulator(optimizer, accum_steps=accum_steps)
+    # scale the loss to keep small float16 gradients from underflowing
+    if precision == 'mixed_float16':
+        optimizer = LossScaleOptimizer(optimizer)
+    # select the fastest data format for this device if set to auto
+    if data_format == 'auto':
+        data_format = _select_data_format(image_shape,
+            precision=precision,
+            jit_compile=jit_compile,
+        )
     # the input block of the network
     inputs = Input(image_shape, name='SegNet_input')
-    # assume 8-bit inputs and convert to floats in [0,1]
-    x = Lambda(lambda x: x / 255.0, name='pixel_norm')(inputs)
+    x = inputs
+    # arguments used for all blocks, including a single L2 regularizer shared
+    # by all convolutional layers
+    block = dict(regularizer=l2(l2_coeff), data_format=data_format)
+    # arguments used for encoder blocks
+    encoder = dict(block, freeze_bn=freeze_encoder_bn)
+    # scale 8-bit inputs to [0,1]. contrast normalization is invariant to the
+    # scale of its inputs, so there is nothing to scale when it's applied
+    if scale_inputs and not lcn:
+        x = Lambda(lambda x: x / 255.0, name=_PIXEL_NORM)(x)
     # apply contrast normalization if set
     if lcn:
         x = LocalContrastNormalization()(x)
+    # move the channels to the first axis if necessary, NHWC -> NCHW
+    if data_format == 'channels_first':
+        x = Permute((3, 1, 2))(x)
     # if no dropout rate, make the lambda return the input
     if dropout_rate is None:
         dropout = lambda x: x
@@ -172,38 +769,48 @@ def segnet(image_shape: tuple, num_classes: int,
     else:
         dropout = lambda x: Dropout(dropout_rate)(x, training=True)
     # encoder
-    x, pool_1 = _encode(x, 2 * [64])
-    x, pool_2 = _encode(x, 2 * [128])
-    x, pool_3 = _encode(x, 3 * [256])
+    x, pool_1 = _encode(x, 2 * [64], name='encoder_1', **encoder)
+    x, pool_2 = _encode(x, 2 * [128], name='encoder_2', **encoder)
+    x, pool_3 = _encode(x, 3 * [256], name='encoder_3', **encoder)
     x = dropout(x)
-    x, pool_4 = _encode(x, 3 * [512])
+    x, pool_4 = _encode(x, 3 * [512], name='encoder_4', **encoder)
     x = dropout(x)
-    x, pool_5 = _encode(x, 3 * [512])
+    x, pool_5 = _encode(x, 3 * [512], name='encoder_5', **encoder)
     x = dropout(x)
     # decoder
-    x = _decode(x, pool_5, 3 * [512])
+    x = _decode(x, pool_5, 3 * [512], name='decoder_5', **block)
     x = dropout(x)
-    x = _decode(x, pool_4, [512, 512, 256])
+    x = _decode(x, pool_4, [512, 512, 256], name='decoder_4', **block)
     x = dropout(x)
-    x = _decode(x, pool_3, [256, 256, 128])
+    x = _decode(x, pool_3, [256, 256, 128], name='decoder_3', **block)
     x = dropout(x)
-    x = _decode(x, pool_2, [128, 64])
-    x = _decode(x, pool_1, [64])
+    x = _decode(x, pool_2, [128, 64], name='decoder_2', **block)
+    x = _decode(x, pool_1, [64], name='decoder_1', **block)
     # classifier
-    x = _classify(x, num_classes)
+    x = _classify(x, num_classes, **block)
     # compile the model
     model = Model(inputs=[inputs], outputs=[x], name='SegNet')
+    if sparse_labels:
+        loss = build_sparse_categorical_crossentropy(class_weights)
+        accuracy = build_sparse_categorical_accuracy(weights=class_weights)
+    else:
+        loss = build_categorical_crossentropy(class_weights)
+        accuracy = build_categorical_accuracy(weights=class_weights)
     model.compile(
         optimizer=optimizer,
-        loss=build_categorical_crossentropy(class_weights),
-        metrics=[build_categorical_accuracy(weights=class_weights)],
+        loss=loss,
+        metrics=[accuracy, MeanIoU(num_classes, sparse=sparse_labels)],
     )
     # transfer weights from VGG16
     if pretrain_encoder:
-        _transfer_vgg16_encoder(model)
+        _transfer_vgg16_encoder(model, weights_cache=weights_cache)
 
     return model
 
 
 # explicitly define the outward facing API of this module
-__all__ = [segnet.__name__]
+__all__ = [
+    fuse_bn_for_inference.__name__,
+    preprocess_batch.__name__,
+    segnet.__name__,
+]
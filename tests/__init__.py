@@ -0,0 +1 @@
+"""Test cases for the models and extensions in this repository."""
@@ -0,0 +1,53 @@
+"""Test cases for the gradient accumulator optimizer."""
+from unittest import TestCase
+import numpy as np
+from keras import backend as K
+from keras.layers import Dense
+from keras.layers import Input
+from keras.models import Model
+from keras.optimizers import SGD
+from src.optimizers import GradientAccumulator
+
+
+def _model(optimizer) -> Model:
+    """Return a compiled linear regression model."""
+    inputs = Input((4,))
+    model = Model(inputs=[inputs], outputs=[Dense(2)(inputs)])
+    model.compile(optimizer=optimizer, loss='mse')
+    return model
+
+
+class ShouldResolveOptimizer(TestCase):
+    def test(self):
+        optimizer = GradientAccumulator('sgd', accum_steps=2)
+        self.assertIsInstance(optimizer.optimizer, SGD)
+
+
+class ShouldMatchLargeBatch(TestCase):
+    def setUp(self):
+        K.clear_session()
+
+    def test(self):
+        steps, batch_size = 3, 2
+        accumulated = _model(GradientAccumulator(
+            SGD(lr=0.1, momentum=0.9),
+            accum_steps=steps,
+        ))
+        large = _model(SGD(lr=0.1, momentum=0.9))
+        large.set_weights(accumulated.get_weights())
+        # two rounds of accumulation to include the momentum of a round
+        for _ in range(2):
+            x = np.random.uniform(size=(steps * batch_size, 4))
+            y = np.random.uniform(size=(steps * batch_size, 2))
+            weights = accumulated.get_weights()
+            for step in range(steps):
+                batch = slice(step * batch_size, (step + 1) * batch_size)
+                # the weights only change at the end of a round
+                current = accumulated.get_weights()
+                for expected, actual in zip(weights, current):
+                    np.testing.assert_array_equal(expected, actual)
+                accumulated.train_on_batch(x[batch], y[batch])
+            large.train_on_batch(x, y)
+            for expected, actual in zip(large.get_weights(),
+                                        accumulated.get_weights()):
+                np.testing.assert_allclose(expected, actual, atol=1e-6)
@@ -0,0 +1,66 @@
+"""Test cases for the loss scale optimizer."""
+from unittest import TestCase
+import numpy as np
+from keras import backend as K
+from keras.layers import Dense
+from keras.layers import Input
+from keras.models import Model
+from keras.optimizers import SGD
+from src.optimizers import LossScaleOptimizer
+
+
+def _model(optimizer) -> Model:
+    """Return a compiled linear regression model."""
+    inputs = Input((4,))
+    model = Model(inputs=[inputs], outputs=[Dense(2)(inputs)])
+    model.compile(optimizer=optimizer, loss='mse')
+    return model
+
+
+class ShouldResolveOptimizer(TestCase):
+    def test(self):
+        optimizer = LossScaleOptimizer('sgd')
+        self.assertIsInstance(optimizer.optimizer, SGD)
+
+
+class ShouldScaleLoss(TestCase):
+    def setUp(self):
+        K.clear_session()
+        self.optimizer = LossScaleOptimizer(SGD(lr=0.1, momentum=0.9),
+            initial_scale=4.0,
+            growth_interval=2,
+        )
+        self.model = _model(self.optimizer)
+        self.x = np.random.uniform(size=(2, 4))
+        self.y = np.random.uniform(size=(2, 2))
+
+    def test_unscaled_gradients(self):
+        unscaled = _model(SGD(lr=0.1, momentum=0.9))
+        unscaled.set_weights(self.model.get_weights())
+        for _ in range(3):
+            self.model.train_on_batch(self.x, self.y)
+            unscaled.train_on_batch(self.x, self.y)
+        for expected, actual in zip(unscaled.get_weights(),
+                                    self.model.get_weights()):
+            np.testing.assert_allclose(expected, actual, atol=1e-6)
+
+    def test_overflow(self):
+        weights = self.model.get_weights()
+        self.model.train_on_batch(np.full_like(self.x, np.inf), self.y)
+        # the step is skipped, including the updates of the wrapped optimizer
+        for expected, actual in zip(weights, self.model.get_weights()):
+            np.testing.assert_array_equal(expected, actual)
+        self.assertEqual(0, K.get_value(self.optimizer.optimizer.iterations))
+        # the scale halves
+        self.assertEqual(2.0, K.get_value(self.optimizer.loss_scale))
+        self.assertEqual(0, K.get_value(self.optimizer.good_steps))
+
+    def test_growth(self):
+        self.model.train_on_batch(self.x, self.y)
+        self.assertEqual(4.0, K.get_value(self.optimizer.loss_scale))
+        self.assertEqual(1, K.get_value(self.optimizer.good_steps))
+        # the scale doubles after growth_interval steps without overflow
+        self.model.train_on_batch(self.x, self.y)
+        self.assertEqual(8.0, K.get_value(self.optimizer.loss_scale))
+        self.assertEqual(0, K.get_value(self.optimizer.good_steps))
+        self.assertEqual(2, K.get_value(self.optimizer.optimizer.iterations))
@@ -0,0 +1,82 @@
+"""Test cases for the SegNet model."""
+from unittest import TestCase
+import numpy as np
+from keras import backend as K
+from keras.layers import BatchNormalization
+from keras.layers import Lambda
+from src.segnet import fuse_bn_for_inference
+from src.segnet import segnet
+
+
+# a small image shape divisible by the 5 pooling operations of SegNet
+IMAGE_SHAPE = (32, 32, 3)
+
+
+def _segnet(**kwargs):
+    """Return a small SegNet model that doesn't download VGG16 weights."""
+    return segnet(IMAGE_SHAPE, 4,
+        pretrain_encoder=False,
+        data_format='channels_last',
+        **kwargs
+    )
+
+
+def _randomize_batch_norm(model) -> None:
+    """Set random parameters and statistics on the normalization layers."""
+    for layer in model.layers:
+        if isinstance(layer, BatchNormalization):
+            shape = layer.get_weights()[0].shape
+            layer.set_weights([
+                np.random.uniform(0.5, 1.5, shape),
+                np.random.uniform(-0.5, 0.5, shape),
+                np.random.uniform(-0.5, 0.5, shape),
+                np.random.uniform(0.5, 1.5, shape),
+            ])
+
+
+class ShouldUseFusedBatchNorm(TestCase):
+    def setUp(self):
+        K.clear_session()
+
+    def test(self):
+        _segnet()
+        graph = K.get_session().graph
+        types = {op.type for op in graph.get_operations()}
+        fused = [t for t in types if t.startswith('FusedBatchNorm')]
+        self.assertTrue(fused)
+
+
+class ShouldFuseBatchNormForInference(TestCase):
+    def setUp(self):
+        K.clear_session()
+
+    def test_layers(self):
+        model = fuse_bn_for_inference(_segnet(lcn=False))
+        for layer in model.layers:
+            self.assertNotIsInstance(layer, BatchNormalization)
+            self.assertNotIsInstance(layer, Lambda)
+
+    def test_outputs(self):
+        model = _segnet(lcn=False)
+        _randomize_batch_norm(model)
+        fused = fuse_bn_for_inference(model)
+        x = np.random.uniform(0, 255, (2,) + IMAGE_SHAPE)
+        np.testing.assert_allclose(
+            fused.predict(x),
+            model.predict(x),
+            atol=1e-4,
+        )
+
+
+class ShouldTrainAfterSessionOptionsChange(TestCase):
+    def setUp(self):
+        K.clear_session()
+
+    def test(self):
+        # the second build replaces the session configured by the first
+        _segnet(jit_compile=True)
+        model = _segnet()
+        x = np.random.uniform(0, 255, (1,) + IMAGE_SHAPE)
+        y = np.zeros((1,) + IMAGE_SHAPE[:-1] + (4,))
+        y[..., 0] = 1
+        model.train_on_batch(x, y)
@@ -0,0 +1,31 @@
+"""Test cases for the extensions to the TensorFlow back-end."""
+from unittest import TestCase
+import numpy as np
+from keras import backend as K
+from src.backend.tensorflow_backend import pack_argmax
+from src.backend.tensorflow_backend import pool2d_argmax
+from src.backend.tensorflow_backend import unpack_argmax
+
+
+class ShouldRoundTripPackedArgmax(TestCase):
+    def _test(self, shape, pool_size, data_format):
+        x = K.constant(np.random.uniform(size=shape))
+        _, idx = pool2d_argmax(x, pool_size,
+            strides=pool_size,
+            data_format=data_format,
+        )
+        offset = pack_argmax(idx, pool_size, data_format=data_format)
+        unpacked = unpack_argmax(offset, pool_size, data_format=data_format)
+        idx, offset, unpacked = K.batch_get_value([idx, offset, unpacked])
+        self.assertEqual(np.uint8, offset.dtype)
+        self.assertTrue(np.all(offset < pool_size[0] * pool_size[1]))
+        np.testing.assert_array_equal(idx, unpacked)
+
+    def test_channels_last(self):
+        self._test((2, 8, 6, 3), (2, 2), 'channels_last')
+
+    def test_channels_first(self):
+        self._test((2, 3, 8, 6), (2, 2), 'channels_first')
+
+    def test_odd_pool_size(self):
+        self._test((2, 9, 6, 3), (3, 2), 'channels_last')